@@ -9,6 +9,7 @@ from peachpy.abi import Endianness
 class Encoder:
     def __init__(self, endianness, bitness=None):
         assert endianness in {Endianness.Little, Endianness.Big}
+        self.endianness = endianness
         if endianness == Endianness.Little:
             self.int16 = Encoder.int16le
             self.uint16 = Encoder.uint16le
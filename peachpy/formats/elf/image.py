@@ -6,7 +6,9 @@ class Image:
     def __init__(self, abi, source=None):
         from peachpy.formats.elf.section import null_section, StringSection, SymbolSection, SectionIndex
         from peachpy.formats.elf.symbol import Symbol, SymbolBinding, SymbolType
+        from peachpy.encoder import Encoder
         self.abi = abi
+        self.encoder = Encoder(abi.endianness, abi.elf_bitness)
         self.shstrtab = StringSection(".shstrtab")
         self.strtab = StringSection(".strtab")
         self.symtab = SymbolSection(string_table=self.strtab)
@@ -38,6 +40,14 @@ class Image:
 
     @property
     def as_bytearray(self):
+        import io
+        output_file = io.BytesIO()
+        self.write_to(output_file)
+        return bytearray(output_file.getvalue())
+
+    def write_to(self, output_file):
+        """Serializes the image into a file-like object section-by-section without materializing the whole image"""
+
         import six
         from peachpy.formats.elf.file import FileHeader
         from peachpy.formats.elf.section import Section, StringSection, SymbolSection
@@ -67,20 +77,21 @@ class Image:
             section_offsets.append(data_offset)
             data_offset += section.get_content_size(self.abi)
 
-        from peachpy.encoder import Encoder
-        encoder = Encoder(self.abi.endianness, self.abi.elf_bitness)
-
+        encoder = self.encoder
         section_index_map = {section: index for index, section in enumerate(self.sections)}
         # Write section headers
         for section, offset in zip(self.sections, section_offsets):
             data += section.encode_header(encoder, self.shstrtab._string_index_map, section_index_map, offset)
+        output_file.write(data)
+        data_offset = len(data)
 
         # Write section content
+        symbol_index_map = self.symtab.symbol_index_map
         for section in self.sections:
-            padding = bytearray(roundup(len(data), section.alignment) - len(data))
-            data += padding
-            data += section.encode_content(encoder,
-                                           self.strtab._string_index_map, section_index_map,
-                                           self.symtab.symbol_index_map)
-
-        return data
+            padding = bytearray(roundup(data_offset, section.alignment) - data_offset)
+            content = section.encode_content(encoder,
+                                             self.strtab._string_index_map, section_index_map,
+                                             symbol_index_map)
+            output_file.write(padding)
+            output_file.write(content)
+            data_offset += len(padding) + len(content)
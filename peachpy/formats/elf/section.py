@@ -222,10 +222,12 @@ class StringSection(Section):
         if self.content_size != 0:
             import codecs
 
-            bytes = b"\x00"
+            # Accumulate in a bytearray: concatenation of immutable bytes is quadratic in the number of strings
+            content = bytearray(1)
             for string in sorted(self._string_index_map, key=self._string_index_map.get):
-                bytes += codecs.encode(string, "utf8") + b"\x00"
-            return bytes
+                content += codecs.encode(string, "utf8")
+                content.append(0)
+            return content
         else:
             return bytearray()
 
@@ -324,7 +326,8 @@ class RelocationsWithAddendSection(Section):
         assert isinstance(encoder, peachpy.encoder.Encoder)
         assert encoder.bitness in [32, 64]
 
-        entry_size = {32: 16, 64: 24}[encoder.bitness]
+        from peachpy.formats.elf.symbol import RelocationWithAddend
+        entry_size = RelocationWithAddend.get_entry_struct(encoder).size
         relocations_count = len(self.relocations)
         reference_section_index = section_index_map[self.reference_section]
         return super(RelocationsWithAddendSection, self).\
@@ -338,8 +341,19 @@ class RelocationsWithAddendSection(Section):
         super(RelocationsWithAddendSection, self).\
             encode_content(encoder, name_index_map, section_index_map, symbol_index_map)
 
-        content = bytearray()
+        # Pack all entries into a single preallocated buffer instead of concatenating per-field encodings
+        from peachpy.formats.elf.symbol import RelocationWithAddend
+        entry_struct = RelocationWithAddend.get_entry_struct(encoder)
+        entry_size = entry_struct.size
+        content = bytearray(entry_size * len(self.relocations))
+        # This loop dominates encoding of large sections: it packs the entries directly rather than calling
+        # RelocationWithAddend.encode for each of them
+        symbol_index_shift = RelocationWithAddend.get_info_shift(encoder.bitness)
+        pack_into = entry_struct.pack_into
+        offset = 0
         for relocation in self.relocations:
-            content += relocation.encode(encoder, symbol_index_map)
+            info = (symbol_index_map[relocation.symbol] << symbol_index_shift) | relocation.type
+            pack_into(content, offset, relocation.offset, info, relocation.addend)
+            offset += entry_size
 
         return content
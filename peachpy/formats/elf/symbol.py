@@ -251,15 +251,27 @@ class RelocationWithAddend:
 
         return {32: 12, 64: 24}[abi.elf_bitness]
 
-    def encode(self, encoder, symbol_index_map):
+    @staticmethod
+    def get_entry_struct(encoder):
+        import struct
         import peachpy.encoder
+        from peachpy.abi import Endianness
         assert isinstance(encoder, peachpy.encoder.Encoder)
         assert encoder.bitness in [32, 64]
-        assert self.symbol in symbol_index_map
 
-        symbol_index = symbol_index_map[self.symbol]
-        info = (symbol_index << 32) | self.type
+        byte_order = {Endianness.Little: "<", Endianness.Big: ">"}[encoder.endianness]
+        return struct.Struct(byte_order + {32: "IIi", 64: "QQq"}[encoder.bitness])
+
+    @staticmethod
+    def get_info_shift(bitness):
+        assert bitness in [32, 64]
+
+        # r_info holds the symbol index in the upper bits and the relocation type in the lower 8 (ELF32) or 32 bits
+        return {32: 8, 64: 32}[bitness]
+
+    def encode(self, encoder, symbol_index_map):
+        assert self.symbol in symbol_index_map
 
-        return encoder.unsigned_offset(self.offset) + \
-            encoder.unsigned_offset(info) + \
-            encoder.signed_offset(self.addend)
+        entry_struct = RelocationWithAddend.get_entry_struct(encoder)
+        info = (symbol_index_map[self.symbol] << RelocationWithAddend.get_info_shift(encoder.bitness)) | self.type
+        return bytearray(entry_struct.pack(self.offset, info, self.addend))
@@ -28,6 +28,14 @@ class Image:
         self.segments.append(segment)
 
     def encode(self):
+        import io
+        output_file = io.BytesIO()
+        self.write_to(output_file)
+        return bytearray(output_file.getvalue())
+
+    def write_to(self, output_file):
+        """Serializes the image into a file-like object section-by-section without materializing the whole image"""
+
         from peachpy.formats.macho.file import MachHeader
         from peachpy.formats.macho.symbol import Relocation
         from peachpy.util import roundup
@@ -100,13 +108,18 @@ class Image:
             data += segment.encode_command(encoder, section_offset_map, section_address_map, section_relocations_map)
         data += self.symbol_table.encode_command(encoder, symbol_offset_map, string_table_offset)
 
+        output_file.write(data)
+        data_offset = len(data)
+
         # Write section data
         for segment in self.segments:
             for section in segment.sections:
-                padding = bytearray(roundup(len(data), section.alignment) - len(data))
-                data += padding + section.content
-        padding = bytearray(roundup(len(data), self.abi.pointer_size) - len(data))
-        data += padding
+                padding = bytearray(roundup(data_offset, section.alignment) - data_offset)
+                output_file.write(padding)
+                output_file.write(section.content)
+                data_offset += len(padding) + len(section.content)
+        padding = bytearray(roundup(data_offset, self.abi.pointer_size) - data_offset)
+        data = padding
 
         # Write relocations
         for segment in self.segments:
@@ -121,4 +134,4 @@ class Image:
         # Write string table
         data += self.string_table.encode()
 
-        return data
+        output_file.write(data)
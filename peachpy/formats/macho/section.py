@@ -278,9 +278,11 @@ class StringTable:
     def encode(self):
         import codecs
         if self.size != 0:
-            bytestring = b"\x00"
+            # Accumulate in a bytearray: concatenation of immutable bytes is quadratic in the number of strings
+            content = bytearray(1)
             for string in sorted(self.string_index_map, key=self.string_index_map.get):
-                bytestring += codecs.encode(string, "utf8") + b"\x00"
-            return bytestring
+                content += codecs.encode(string, "utf8")
+                content.append(0)
+            return content
         else:
             return bytearray()
@@ -46,6 +46,14 @@ class Image:
         self.symbols.append(symbol)
 
     def encode(self):
+        import io
+        output_file = io.BytesIO()
+        self.write_to(output_file)
+        return bytearray(output_file.getvalue())
+
+    def write_to(self, output_file):
+        """Serializes the image into a file-like object section-by-section without materializing the whole image"""
+
         from peachpy.encoder import Encoder
         encoder = Encoder(self.abi.endianness)
 
@@ -104,13 +112,16 @@ class Image:
             data += symbol.encode_entry(encoder, self.string_table._strings, section_index_map)
         data += self.string_table.encode()
 
+        output_file.write(data)
+
         # Write section content
         for section in self.sections:
-            data += section.content
+            output_file.write(section.content)
 
         # Write section relocations
+        data = bytearray()
         for section in self.sections:
             for relocation in section.relocations:
                 data += relocation.encode_entry(encoder, symbol_index_map)
 
-        return data
+        output_file.write(data)
@@ -156,7 +156,8 @@ class StringTable:
         import codecs
         import peachpy.encoder
 
-        bytestring = peachpy.encoder.Encoder.uint32le(self.size)
+        content = peachpy.encoder.Encoder.uint32le(self.size)
         for string in sorted(self._strings, key=self._strings.get):
-            bytestring += codecs.encode(string, "utf8") + b"\x00"
-        return bytestring
+            content += codecs.encode(string, "utf8")
+            content.append(0)
+        return content
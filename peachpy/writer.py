@@ -1,39 +1,183 @@
 # This file is part of PeachPy package and is licensed under the Simplified BSD license.
 #    See license.rst for the full text of the license.
 
-active_writers = []
+import errno
+import os
+import stat
+import threading
+import uuid
+
+import peachpy
+import peachpy.x86_64.function
+import peachpy.formats.elf.image
+import peachpy.formats.elf.section
+import peachpy.formats.elf.symbol
+import peachpy.formats.macho.image
+import peachpy.formats.macho.symbol
+import peachpy.formats.mscoff
+from peachpy.formats import elf, macho, mscoff
+from peachpy.util import roundup
+
+# Map from assembly format to the prefix of a single-line comment
+comment_prefix_map = {
+    "go": "//",
+    "nasm": ";",
+    "masm": ";",
+    "gas": "#"
+}
+
+# Per-thread state: each thread has its own list of active writers
+_thread_state = threading.local()
+
+
+def get_active_writers():
+    """Returns the list of writers which receive functions finalized on the current thread"""
+    active_writers = getattr(_thread_state, "active_writers", None)
+    if active_writers is None:
+        active_writers = _thread_state.active_writers = []
+    return active_writers
+
+
+def _replace_file(source_path, destination_path):
+    """Atomically replaces the destination file with the source file"""
+    if hasattr(os, "replace"):
+        os.replace(source_path, destination_path)
+    else:
+        # Python 2: rename replaces existing files atomically on POSIX, but fails on Windows
+        if os.name == "nt" and os.path.exists(destination_path):
+            os.unlink(destination_path)
+        os.rename(source_path, destination_path)
+
+
+def _create_temporary_file(directory, name):
+    """Creates a new file with a unique random name in the directory
+
+    The file is created with the same permissions as open would use for a new file, i.e. subject to the umask.
+
+    :returns: a tuple of the file descriptor open for writing and the path of the file.
+    """
+    # O_BINARY prevents newline translation of the file descriptor on Windows, as in the io module
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0) | getattr(os, "O_NOINHERIT", 0)
+    while True:
+        temporary_path = os.path.join(directory, "%s.%s.tmp" % (name, uuid.uuid4().hex[:12]))
+        try:
+            return os.open(temporary_path, flags, 0o666), temporary_path
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+
+def _open_output(output_path, mode):
+    """Opens the output file for writing
+
+    If the output is a regular file or does not exist yet, the content is written into a uniquely named temporary file
+    in the same directory, which replaces the output file only when committed with _commit_output. Other outputs, e.g.
+    devices or pipes, are written directly.
+
+    :returns: a tuple of the opened file object, the path of the file to replace on commit (the target of the output
+        path if it is a symbolic link), and the path of the temporary file or None if the output is written directly.
+    """
+    # Links are followed to the actual output: e.g. /dev/stdout resolves to a pipe or a terminal
+    try:
+        output_mode = os.stat(output_path).st_mode
+    except OSError:
+        output_mode = None
+    if output_mode is not None and not stat.S_ISREG(output_mode):
+        return open(output_path, mode), None, None
+
+    destination_path = os.path.realpath(output_path)
+    destination_directory, destination_name = os.path.split(destination_path)
+    temporary_fd, temporary_path = _create_temporary_file(destination_directory or ".", destination_name)
+    try:
+        if output_mode is not None:
+            # The replaced output file keeps its permissions
+            os.chmod(temporary_path, stat.S_IMODE(output_mode))
+        return os.fdopen(temporary_fd, mode), destination_path, temporary_path
+    except BaseException:
+        os.close(temporary_fd)
+        os.unlink(temporary_path)
+        raise
+
+
+def _commit_output(output_file, destination_path, temporary_path, durable):
+    """Closes the output file and replaces the destination with the temporary file, if any"""
+    try:
+        # Outputs which are not regular files, e.g. pipes and devices, are written directly and can not be synced
+        if durable and temporary_path is not None:
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        output_file.close()
+        if temporary_path is not None:
+            _replace_file(temporary_path, destination_path)
+            if durable and os.name == "posix":
+                # The replacement is a change of the directory entry: it persists only after the directory is synced
+                directory_fd = os.open(os.path.dirname(destination_path), os.O_RDONLY)
+                try:
+                    os.fsync(directory_fd)
+                finally:
+                    os.close(directory_fd)
+    except BaseException:
+        _discard_output(output_file, temporary_path)
+        raise
+
+
+def _discard_output(output_file, temporary_path):
+    """Closes the output file and removes the temporary file, if any, leaving the destination intact"""
+    try:
+        # The file must be closed before it can be removed on Windows
+        output_file.close()
+    finally:
+        if temporary_path is not None and os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+
+
+class NullWriter(object):
+    """Suspends all writers active on the current thread until the context is exited"""
+
+    def __init__(self):
+        self.previous_writers = None
+
+    def __enter__(self):
+        self.previous_writers = get_active_writers()
+        _thread_state.active_writers = []
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _thread_state.active_writers = self.previous_writers
+        self.previous_writers = None
 
 
 class TextWriter(object):
-    def __init__(self, output_path):
+    def __init__(self, output_path, durable=False):
         super(TextWriter, self).__init__()
         self.output_path = output_path
+        # Whether to synchronize the output file with the storage device before replacing the output
+        self.durable = durable
         self.prologue = []
         self.content = []
         self.epilogue = []
 
     def __enter__(self):
-        global active_writers
-        active_writers.append(self)
-        self.output_file = open(self.output_path, "w")
+        get_active_writers().append(self)
+        # Regular output files are written through a temporary file which replaces the output only on success
+        self.output_file, self.destination_path, self.temporary_path = _open_output(self.output_path, "w")
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        global active_writers
-        active_writers.remove(self)
+        get_active_writers().remove(self)
+        output_file, self.output_file = self.output_file, None
         if exc_type is None:
-            self.output_file.write(self.serialize())
-            self.output_file.close()
-            self.output_file = None
+            try:
+                output_file.write(self.serialize())
+            except BaseException:
+                _discard_output(output_file, self.temporary_path)
+                raise
+            _commit_output(output_file, self.destination_path, self.temporary_path, self.durable)
         else:
-            import os
-            os.unlink(self.output_file.name)
-            self.output_file = None
+            _discard_output(output_file, self.temporary_path)
             raise
 
     def serialize(self):
-        import os
-
         prologue = self.prologue
         if not isinstance(prologue, str):
             prologue = os.linesep.join(map(str, prologue))
@@ -52,27 +196,24 @@ class TextWriter(object):
 
         return prologue + content + epilogue
 
+    def add_functions(self, functions):
+        for function in functions:
+            self.add_function(function)
+
 
 class AssemblyWriter(TextWriter):
-    def __init__(self, output_path, assembly_format, input_path=None):
-        super(AssemblyWriter, self).__init__(output_path)
-        if assembly_format not in {"go", "nasm", "masm", "gas"}:
+    def __init__(self, output_path, assembly_format, input_path=None, durable=False):
+        super(AssemblyWriter, self).__init__(output_path, durable)
+        if assembly_format not in comment_prefix_map:
             raise ValueError("Unknown assembly format: %s" % assembly_format)
         self.assembly_format = assembly_format
-        self.comment_prefix = {
-            "go": "//",
-            "nasm": ";",
-            "masm": ";",
-            "gas": "#"
-        }[assembly_format]
+        self.comment_prefix = comment_prefix_map[assembly_format]
 
         if assembly_format == "go":
-            from os import linesep
-            self.prologue = "// +build !noasm" + linesep
+            self.prologue = "// +build !noasm" + os.linesep
         else:
             self.prologue = ""
 
-        import peachpy
         if input_path is not None:
             self.prologue += "{escape} Generated by PeachPy {version} from {filename}".format(
                 escape=self.comment_prefix, version=peachpy.__version__, filename=input_path)
@@ -80,65 +221,93 @@ class AssemblyWriter(TextWriter):
             self.prologue += "{escape} Generated by PeachPy {version}".format(
                 escape=self.comment_prefix, version=peachpy.__version__)
         self.prologue_lines = len(self.prologue.splitlines()) + 3
+        self.content_lines = 0
+
+    def __enter__(self):
+        super(AssemblyWriter, self).__enter__()
+        # Function listings are streamed into the file as they are added: each line is preceded by a line separator,
+        # so only two of the three separators after the prologue are written here
+        self.output_file.write(self.prologue + os.linesep * 2)
+        self.content_lines = 0
+        return self
+
+    def serialize(self):
+        # Prologue and content are already in the file, only complete the separator if no lines followed
+        return os.linesep if self.content_lines == 0 else ""
 
     def add_function(self, function):
-        import peachpy.x86_64.function
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
 
-        function_lines = function.format(self.assembly_format, line_separator=None, line_number=self.prologue_lines + len(self.content))
-        self.content += function_lines
+        function_lines = function.format_lines(self.assembly_format,
+                                               line_number=self.prologue_lines + self.content_lines)
+        for line in function_lines:
+            self.output_file.write(os.linesep + str(line))
+            self.content_lines += 1
 
 
 class ImageWriter(object):
-    def __init__(self, output_path):
+    def __init__(self, output_path, durable=False):
         super(ImageWriter, self).__init__()
         self.output_path = output_path
+        # Whether to synchronize the output file with the storage device before replacing the output
+        self.durable = durable
 
     def __enter__(self):
-        global active_writers
-        active_writers.append(self)
-        self.output_file = open(self.output_path, "wb", buffering=0)
+        get_active_writers().append(self)
+        # Regular output files are written through a temporary file which replaces the output only on success
+        self.output_file, self.destination_path, self.temporary_path = _open_output(self.output_path, "wb")
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        global active_writers
-        active_writers.remove(self)
+        get_active_writers().remove(self)
+        output_file, self.output_file = self.output_file, None
         if exc_type is None:
-            self.output_file.write(self.encode())
-            self.output_file.close()
-            self.output_file = None
+            try:
+                self.write_to(output_file)
+            except BaseException:
+                _discard_output(output_file, self.temporary_path)
+                raise
+            _commit_output(output_file, self.destination_path, self.temporary_path, self.durable)
         else:
-            import os
-            os.unlink(self.output_file.name)
-            self.output_file = None
+            _discard_output(output_file, self.temporary_path)
             raise
 
     def encode(self):
         return bytearray()
 
+    def write_to(self, output_file):
+        output_file.write(self.encode())
+
+    def add_functions(self, functions):
+        for function in functions:
+            self.add_function(function)
+
 
 class ELFWriter(ImageWriter):
-    def __init__(self, output_path, abi, input_path=None):
-        super(ELFWriter, self).__init__(output_path)
-        from peachpy.formats.elf.image import Image
-        from peachpy.formats.elf.section import TextSection, ProgramBitsSection
+    def __init__(self, output_path, abi, input_path=None, durable=False):
+        super(ELFWriter, self).__init__(output_path, durable)
 
         self.abi = abi
-        self.image = Image(abi, input_path)
-        self.text_section = TextSection()
+        self.image = elf.image.Image(abi, input_path)
+        self.text_section = elf.section.TextSection()
         self.image.add_section(self.text_section)
-        self.gnu_stack_section = ProgramBitsSection(".note.GNU-stack", allocate=False)
+        self.gnu_stack_section = elf.section.ProgramBitsSection(".note.GNU-stack", allocate=False)
         self.image.add_section(self.gnu_stack_section)
         self.text_rela_section = None
         self.rodata_section = None
+        # Map from content of a constant to its offset in the read-only data section
+        self._const_offset_cache = dict()
+        # Map from (offset, size) of a constant in the read-only data section to its ELF symbol
+        self._const_symbol_cache = dict()
 
     def encode(self):
         return self.image.as_bytearray
 
+    def write_to(self, output_file):
+        self.image.write_to(output_file)
+
     def add_function(self, function):
-        import peachpy.x86_64.function
-        from peachpy.util import roundup
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
 
@@ -152,79 +321,87 @@ class ELFWriter(ImageWriter):
         self.text_section.content += encoded_function.code_section.content
         self.text_section.alignment = max(self.text_section.alignment, encoded_function.code_section.alignment)
 
-        const_offset = 0
+        # Map from PeachPy symbol to offset of the constant in the read-only data section
+        const_offset_map = dict()
         if encoded_function.const_section.content:
             if self.rodata_section is None:
-                from peachpy.formats.elf.section import ReadOnlyDataSection
-                self.rodata_section = ReadOnlyDataSection()
+                self.rodata_section = elf.section.ReadOnlyDataSection()
                 self.image.add_section(self.rodata_section)
-            const_offset = self.rodata_section.get_content_size(self.abi)
-            const_padding = bytearray([encoded_function.const_section.alignment_byte] *
-                                      (roundup(const_offset, encoded_function.const_section.alignment) - const_offset))
-            self.rodata_section.content += const_padding
-            const_offset += len(const_padding)
-            self.rodata_section.content += encoded_function.const_section.content
-            self.rodata_section.alignment = max(self.rodata_section.alignment, encoded_function.const_section.alignment)
-
-        # Map from symbol name to symbol index
-        from peachpy.formats.elf.symbol import Symbol, SymbolBinding, SymbolType
+            const_section = encoded_function.const_section
+            for symbol in const_section.symbols:
+                # Constants are content-addressed: identical constants across functions are stored only once
+                const_content = bytes(const_section.content[symbol.offset:symbol.offset + symbol.size])
+                const_offset = self._const_offset_cache.get(const_content)
+                if const_offset is None or const_offset % const_section.alignment != 0:
+                    const_offset = self.rodata_section.get_content_size(self.abi)
+                    const_padding = bytearray([const_section.alignment_byte] *
+                                              (roundup(const_offset, const_section.alignment) - const_offset))
+                    self.rodata_section.content += const_padding
+                    const_offset += len(const_padding)
+                    self.rodata_section.content += const_content
+                    self._const_offset_cache[const_content] = const_offset
+                const_offset_map[symbol] = const_offset
+            self.rodata_section.alignment = max(self.rodata_section.alignment, const_section.alignment)
+
+        # Map from PeachPy symbol to ELF symbol
         symbol_map = dict()
         for symbol in encoded_function.const_section.symbols:
-            const_symbol = Symbol()
-            const_symbol.name = function.mangled_name + "." + symbol.name
-            const_symbol.value = const_offset + symbol.offset
-            const_symbol.size = symbol.size
-            const_symbol.section = self.rodata_section
-            const_symbol.binding = SymbolBinding.local
-            const_symbol.type = SymbolType.data_object
-            self.image.symtab.add(const_symbol)
+            # Constants which share storage in the read-only data section share the ELF symbol
+            const_key = (const_offset_map[symbol], symbol.size)
+            const_symbol = self._const_symbol_cache.get(const_key)
+            if const_symbol is None:
+                const_symbol = elf.symbol.Symbol()
+                const_symbol.name = function.mangled_name + "." + symbol.name
+                const_symbol.value = const_offset_map[symbol]
+                const_symbol.size = symbol.size
+                const_symbol.section = self.rodata_section
+                const_symbol.binding = elf.symbol.SymbolBinding.local
+                const_symbol.type = elf.symbol.SymbolType.data_object
+                self.image.symtab.add(const_symbol)
+                self._const_symbol_cache[const_key] = const_symbol
             symbol_map[symbol] = const_symbol
 
         if encoded_function.code_section.relocations:
             if self.text_rela_section is None:
-                from peachpy.formats.elf.section import RelocationsWithAddendSection
-                self.text_rela_section = RelocationsWithAddendSection(self.text_section, self.image.symtab)
+                self.text_rela_section = elf.section.RelocationsWithAddendSection(self.text_section, self.image.symtab)
                 self.image.add_section(self.text_rela_section)
 
-            from peachpy.formats.elf.symbol import RelocationWithAddend, RelocationType
+            # All references to constants are RIP-relative with a 32-bit displacement
+            relocation_type = elf.symbol.RelocationType.x86_64_pc32
             for relocation in encoded_function.code_section.relocations:
-                elf_relocation = RelocationWithAddend(RelocationType.x86_64_pc32,
-                                                      code_offset + relocation.offset,
-                                                      symbol_map[relocation.symbol],
-                                                      relocation.offset - relocation.program_counter)
+                elf_relocation = elf.symbol.RelocationWithAddend(relocation_type,
+                                                                code_offset + relocation.offset,
+                                                                symbol_map[relocation.symbol],
+                                                                relocation.offset - relocation.program_counter)
                 self.text_rela_section.add(elf_relocation)
 
-        function_symbol = Symbol()
+        function_symbol = elf.symbol.Symbol()
         function_symbol.name = function.mangled_name
         function_symbol.value = code_offset
         function_symbol.content_size = len(encoded_function.code_section)
         function_symbol.section = self.text_section
-        function_symbol.binding = SymbolBinding.global_
-        function_symbol.type = SymbolType.function
+        function_symbol.binding = elf.symbol.SymbolBinding.global_
+        function_symbol.type = elf.symbol.SymbolType.function
         self.image.symtab.add(function_symbol)
 
 
 class MachOWriter(ImageWriter):
-    def __init__(self, output_path, abi):
-        super(MachOWriter, self).__init__(output_path)
-
-        from peachpy.formats.macho.image import Image
+    def __init__(self, output_path, abi, durable=False):
+        super(MachOWriter, self).__init__(output_path, durable)
 
         self.abi = abi
-        self.image = Image(abi)
+        self.image = macho.image.Image(abi)
 
     def encode(self):
         return self.image.encode()
 
+    def write_to(self, output_file):
+        self.image.write_to(output_file)
+
     def add_function(self, function):
-        import peachpy.x86_64.function
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
 
-        from peachpy.formats.macho.symbol import Symbol, SymbolType, SymbolDescription, SymbolVisibility, \
-            Relocation, RelocationType
-        from peachpy.util import roundup
-
         encoded_function = function.encode()
 
         code_offset = len(self.image.text_section.content)
@@ -248,16 +425,17 @@ class MachOWriter(ImageWriter):
         # Map from PeachPy symbol to Mach-O symbol
         symbol_map = dict()
         for symbol in encoded_function.const_section.symbols:
-            macho_symbol = Symbol("_" + function.mangled_name + "." + symbol.name,
-                                  SymbolType.section_relative, self.image.const_section,
-                                  const_offset + symbol.offset)
-            macho_symbol.description = SymbolDescription.defined
+            macho_symbol = macho.symbol.Symbol("_" + function.mangled_name + "." + symbol.name,
+                                               macho.symbol.SymbolType.section_relative, self.image.const_section,
+                                               const_offset + symbol.offset)
+            macho_symbol.description = macho.symbol.SymbolDescription.defined
             self.image.symbol_table.add_symbol(macho_symbol)
             symbol_map[symbol] = macho_symbol
 
         for relocation in encoded_function.code_section.relocations:
-            macho_relocation = Relocation(RelocationType.x86_64_signed, code_offset + relocation.offset, 4,
-                                          symbol_map[relocation.symbol], is_pc_relative=True)
+            macho_relocation = macho.symbol.Relocation(macho.symbol.RelocationType.x86_64_signed,
+                                                       code_offset + relocation.offset, 4,
+                                                       symbol_map[relocation.symbol], is_pc_relative=True)
             relocation_addend = relocation.offset + 4 - relocation.program_counter
             if relocation_addend != 0:
                 self.image.text_section.content[code_offset + relocation.offset] = relocation_addend & 0xFF
@@ -267,36 +445,34 @@ class MachOWriter(ImageWriter):
 
             self.image.text_section.relocations.append(macho_relocation)
 
-        function_symbol = Symbol("_" + function.mangled_name, SymbolType.section_relative, self.image.text_section,
-                                 value=code_offset)
-        function_symbol.description = SymbolDescription.defined
-        function_symbol.visibility = SymbolVisibility.external
+        function_symbol = macho.symbol.Symbol("_" + function.mangled_name, macho.symbol.SymbolType.section_relative,
+                                              self.image.text_section, value=code_offset)
+        function_symbol.description = macho.symbol.SymbolDescription.defined
+        function_symbol.visibility = macho.symbol.SymbolVisibility.external
         self.image.symbol_table.add_symbol(function_symbol)
 
 
 class MSCOFFWriter(ImageWriter):
-    def __init__(self, output_path, abi, input_path=None):
-        super(MSCOFFWriter, self).__init__(output_path)
-
-        from peachpy.formats.mscoff import Image, TextSection, ReadOnlyDataSection
+    def __init__(self, output_path, abi, input_path=None, durable=False):
+        super(MSCOFFWriter, self).__init__(output_path, durable)
 
         self.output_path = output_path
         self.abi = abi
-        self.image = Image(abi, input_path)
-        self.text_section = TextSection()
+        self.image = mscoff.Image(abi, input_path)
+        self.text_section = mscoff.TextSection()
         self.image.add_section(self.text_section)
-        self.rdata_section = ReadOnlyDataSection()
+        self.rdata_section = mscoff.ReadOnlyDataSection()
         self.image.add_section(self.rdata_section)
 
     def encode(self):
         return self.image.encode()
 
+    def write_to(self, output_file):
+        self.image.write_to(output_file)
+
     def add_function(self, function):
-        import peachpy.x86_64.function
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
-        from peachpy.util import roundup
-        from peachpy.formats.mscoff import Symbol, SymbolType, StorageClass, Relocation, RelocationType
 
         encoded_function = function.encode()
 
@@ -321,46 +497,45 @@ class MSCOFFWriter(ImageWriter):
         # Map from PeachPy symbol to Mach-O symbol
         symbol_map = dict()
         for symbol in encoded_function.const_section.symbols:
-            mscoff_symbol = Symbol()
+            mscoff_symbol = mscoff.Symbol()
             mscoff_symbol.name = symbol.name
             mscoff_symbol.value = rdata_offset + symbol.offset
             mscoff_symbol.section = self.rdata_section
-            mscoff_symbol.symbol_type = SymbolType.non_function
-            mscoff_symbol.storage_class = StorageClass.static
+            mscoff_symbol.symbol_type = mscoff.SymbolType.non_function
+            mscoff_symbol.storage_class = mscoff.StorageClass.static
             self.image.add_symbol(mscoff_symbol)
             symbol_map[symbol] = mscoff_symbol
 
         for relocation in encoded_function.code_section.relocations:
             relocation_type_map = {
-                4: RelocationType.x86_64_relocation_offset32,
-                5: RelocationType.x86_64_relocation_plus_1_offset32,
-                6: RelocationType.x86_64_relocation_plus_2_offset32,
-                7: RelocationType.x86_64_relocation_plus_3_offset32,
-                8: RelocationType.x86_64_relocation_plus_4_offset32,
-                9: RelocationType.x86_64_relocation_plus_5_offset32
+                4: mscoff.RelocationType.x86_64_relocation_offset32,
+                5: mscoff.RelocationType.x86_64_relocation_plus_1_offset32,
+                6: mscoff.RelocationType.x86_64_relocation_plus_2_offset32,
+                7: mscoff.RelocationType.x86_64_relocation_plus_3_offset32,
+                8: mscoff.RelocationType.x86_64_relocation_plus_4_offset32,
+                9: mscoff.RelocationType.x86_64_relocation_plus_5_offset32
             }
             relocation_type = relocation_type_map[relocation.program_counter - relocation.offset]
-            mscoff_relocation = Relocation(relocation_type,
-                                           code_offset + relocation.offset,
-                                           symbol_map[relocation.symbol])
+            mscoff_relocation = mscoff.Relocation(relocation_type,
+                                                  code_offset + relocation.offset,
+                                                  symbol_map[relocation.symbol])
             self.text_section.relocations.append(mscoff_relocation)
 
-        function_symbol = Symbol()
+        function_symbol = mscoff.Symbol()
         function_symbol.name = function.mangled_name
         function_symbol.value = code_offset
         function_symbol.section = self.text_section
-        function_symbol.symbol_type = SymbolType.function
-        function_symbol.storage_class = StorageClass.external
+        function_symbol.symbol_type = mscoff.SymbolType.function
+        function_symbol.storage_class = mscoff.StorageClass.external
         self.image.add_symbol(function_symbol)
 
 
 class MetadataWriter(TextWriter):
-    def __init__(self, output_path):
-        super(MetadataWriter, self).__init__(output_path)
+    def __init__(self, output_path, durable=False):
+        super(MetadataWriter, self).__init__(output_path, durable)
         self.metadata = []
 
     def add_function(self, function):
-        import peachpy.x86_64.function
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
 
@@ -368,8 +543,8 @@ class MetadataWriter(TextWriter):
 
 
 class JSONMetadataWriter(MetadataWriter):
-    def __init__(self, output_path):
-        super(JSONMetadataWriter, self).__init__(output_path)
+    def __init__(self, output_path, durable=False):
+        super(JSONMetadataWriter, self).__init__(output_path, durable)
 
     def serialize(self):
         import json
@@ -377,10 +552,9 @@ class JSONMetadataWriter(MetadataWriter):
 
 
 class CHeaderWriter(TextWriter):
-    def __init__(self, output_path, input_path=None):
-        super(CHeaderWriter, self).__init__(output_path)
+    def __init__(self, output_path, input_path=None, durable=False):
+        super(CHeaderWriter, self).__init__(output_path, durable)
 
-        import peachpy
         if input_path is not None:
             self.prologue = ["/* Generated by PeachPy %s from %s */" % (peachpy.__version__, input_path)]
         else:
@@ -401,7 +575,6 @@ class CHeaderWriter(TextWriter):
         ]
 
     def add_function(self, function):
-        import peachpy.x86_64.function
         assert isinstance(function, peachpy.x86_64.function.ABIFunction), \
             "Function must be finalized with an ABI before its assembly can be used"
 
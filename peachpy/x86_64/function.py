@@ -199,7 +199,7 @@ class Function:
             if peachpy.x86_64.options.abi is not None:
                 abi_function = self.finalize(peachpy.x86_64.options.abi)
 
-                for writer in peachpy.writer.active_writers:
+                for writer in peachpy.writer.get_active_writers():
                     writer.add_function(abi_function)
         else:
             raise
@@ -983,6 +983,8 @@ class ABIFunction:
 
         self.mangled_name = self.mangle_name()
 
+        self._encoded_function = None
+
     def _update_argument_loads(self, arguments):
         from peachpy.x86_64.pseudo import LOAD
         for instruction in self._instructions:
@@ -1471,6 +1473,15 @@ class ABIFunction:
     def format(self, assembly_format="peachpy", line_separator=os.linesep, line_number=1):
         """Formats assembly listing of the function according to specified parameters"""
 
+        code = list(self.format_lines(assembly_format, line_number=line_number))
+        if line_separator is None:
+            return code
+        else:
+            return str(line_separator).join(code)
+
+    def format_lines(self, assembly_format="peachpy", line_number=1):
+        """Generates lines of assembly listing of the function according to specified parameters"""
+
         if assembly_format == "go":
             # Arguments for TEXT directive in Go assembler
             package_string = self.package
@@ -1516,24 +1527,26 @@ class ABIFunction:
         else:
             code = []
 
-        code += self.format_code(assembly_format, line_separator=None, indent=True, line_number=line_number + len(code))
+        for line in code:
+            yield line
+        for line in self.format_code(assembly_format, line_separator=None, indent=True,
+                                     line_number=line_number + len(code)):
+            yield line
         if assembly_format == "gas":
-            code += [
-                "#ifndef __APPLE__",
-                ".size {name}, .-{name}".format(name=self.mangled_name),
-                "#endif /* !__APPLE__ */",
-            ]
+            yield "#ifndef __APPLE__"
+            yield ".size {name}, .-{name}".format(name=self.mangled_name)
+            yield "#endif /* !__APPLE__ */"
 
         if assembly_format in ["go", "gas"]:
             # Add trailing line or assembler will refuse to compile
-            code.append("")
-        if line_separator is None:
-            return code
-        else:
-            return str(line_separator).join(code)
+            yield ""
 
     def encode(self):
-        return EncodedFunction(self)
+        # ABIFunction is not modified after construction, thus the encoding is computed once and shared by all users,
+        # e.g. multiple image writers active at the same time
+        if self._encoded_function is None:
+            self._encoded_function = EncodedFunction(self)
+        return self._encoded_function
 
     @property
     def metadata(self):
@@ -9,3 +9,172 @@ class FileHeaderSize(unittest.TestCase):
         file_header_bytes = file_header.as_bytearray
         self.assertEqual(len(file_header_bytes), file_header.file_header_size,
                          "ELF header size must match the value specified in the ELF header")
+
+
+class RelocationWithAddendEncoding(unittest.TestCase):
+    def runTest(self):
+        from peachpy.formats.elf.section import RelocationsWithAddendSection, TextSection, SymbolSection
+        from peachpy.formats.elf.symbol import Symbol, RelocationWithAddend, RelocationType
+        from peachpy.encoder import Encoder
+        import peachpy.x86_64.abi
+        abi = peachpy.x86_64.abi.system_v_x86_64_abi
+        encoder = Encoder(abi.endianness, abi.elf_bitness)
+        symbol = Symbol()
+        rela_section = RelocationsWithAddendSection(TextSection(), SymbolSection())
+        rela_section.add(RelocationWithAddend(RelocationType.x86_64_pc32, 0x10, symbol, -4))
+        rela_section.add(RelocationWithAddend(RelocationType.x86_64_pc32, 0x20, symbol, -5))
+        content = rela_section.encode_content(encoder, {}, {}, {symbol: 3})
+        self.assertEqual(len(content), rela_section.get_content_size(abi))
+        reference = bytearray()
+        for offset, addend in [(0x10, -4), (0x20, -5)]:
+            reference += encoder.uint64(offset) + encoder.uint64((3 << 32) | 2) + encoder.int64(addend)
+        self.assertEqual(content, reference)
+        self.assertEqual(rela_section.relocations[0].encode(encoder, {symbol: 3}), reference[:24])
+
+
+class StringSectionEncoding(unittest.TestCase):
+    def runTest(self):
+        from peachpy.formats.elf.section import StringSection
+        from peachpy.encoder import Encoder
+        import peachpy.x86_64.abi
+        abi = peachpy.x86_64.abi.system_v_x86_64_abi
+        string_section = StringSection()
+        self.assertEqual(string_section.add("foo"), 1)
+        self.assertEqual(string_section.add("bar"), 5)
+        self.assertEqual(string_section.add("foo"), 1)
+        content = string_section.encode_content(Encoder(abi.endianness, abi.elf_bitness), {}, None, None)
+        self.assertEqual(content, bytearray(b"\x00foo\x00bar\x00"))
+        self.assertEqual(len(content), string_section.content_size)
+
+
+class ELFWriterOutput(unittest.TestCase):
+    def runTest(self):
+        import os
+        import shutil
+        import struct
+        import tempfile
+        from peachpy.writer import ELFWriter
+        import peachpy.x86_64.abi
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(temp_dir, "output.o")
+            writer = ELFWriter(output_path, peachpy.x86_64.abi.system_v_x86_64_abi, "input.py")
+            with writer:
+                pass
+            with open(output_path, "rb") as output_file:
+                image = output_file.read()
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(image[:6], b"\x7fELF\x02\x01")
+        section_header_offset, = struct.unpack_from("<Q", image, 40)
+        section_header_size, section_count, string_section_index = struct.unpack_from("<HHH", image, 58)
+        self.assertEqual(section_header_offset, 64)
+        self.assertEqual(section_header_size, 64)
+        sections = [struct.unpack_from("<IIQQQQIIQQ", image, section_header_offset + i * section_header_size)
+                    for i in range(section_count)]
+        content_offset = section_header_offset + section_count * section_header_size
+        for _, _, _, _, offset, size, _, _, _, _ in sections:
+            self.assertGreaterEqual(offset, content_offset)
+            self.assertLessEqual(offset + size, len(image))
+        _, _, _, _, last_offset, last_size, _, _, _, _ = sections[-1]
+        self.assertEqual(last_offset + last_size, len(image))
+
+        _, _, _, _, strings_offset, strings_size, _, _, _, _ = sections[string_section_index]
+        strings = image[strings_offset:strings_offset + strings_size]
+        section_names = [strings[section[0]:strings.index(b"\x00", section[0])] for section in sections]
+        self.assertEqual(section_names, [b"", b".shstrtab", b".strtab", b".symtab", b".text", b".note.GNU-stack"])
+
+
+class ELFWriterCleanup(unittest.TestCase):
+    def runTest(self):
+        import os
+        import shutil
+        import tempfile
+        from peachpy.writer import ELFWriter
+        import peachpy.x86_64.abi
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(temp_dir, "output.o")
+            with open(output_path, "wb") as output_file:
+                output_file.write(b"previous content")
+            with self.assertRaises(RuntimeError):
+                with ELFWriter(output_path, peachpy.x86_64.abi.system_v_x86_64_abi):
+                    raise RuntimeError()
+            self.assertEqual(os.listdir(temp_dir), ["output.o"])
+            with open(output_path, "rb") as output_file:
+                self.assertEqual(output_file.read(), b"previous content")
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class ELFWriterConstantDeduplication(unittest.TestCase):
+    def runTest(self):
+        import os
+        import shutil
+        import tempfile
+        from peachpy import Constant
+        from peachpy.x86_64 import Function, ADD, RETURN, eax
+        from peachpy.writer import ELFWriter
+        import peachpy.x86_64.abi
+        abi = peachpy.x86_64.abi.system_v_x86_64_abi
+        functions = []
+        for name in ["f", "g"]:
+            with Function(name, ()) as function:
+                ADD(eax, Constant.uint32(42))
+                RETURN()
+            functions.append(function.finalize(abi))
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            writer = ELFWriter(os.path.join(temp_dir, "output.o"), abi)
+            with writer:
+                writer.add_functions(functions)
+            self.assertEqual(writer.rodata_section.content, bytearray([42, 0, 0, 0]))
+            relocated_symbols = set(relocation.symbol for relocation in writer.text_rela_section.relocations)
+            self.assertEqual(len(relocated_symbols), 1)
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class ELFWriterX32Relocations(unittest.TestCase):
+    def runTest(self):
+        import os
+        import shutil
+        import struct
+        import tempfile
+        from peachpy import Constant, uint32_t
+        from peachpy.x86_64 import Function, MOV, ADD, RETURN, eax
+        from peachpy.writer import ELFWriter
+        import peachpy.x86_64.abi
+        abi = peachpy.x86_64.abi.linux_x32_abi
+        with Function("f", (), uint32_t) as function:
+            MOV(eax, 1)
+            ADD(eax, Constant.uint32(42))
+            RETURN(eax)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            output_path = os.path.join(temp_dir, "output.o")
+            writer = ELFWriter(output_path, abi)
+            with writer:
+                writer.add_function(function.finalize(abi))
+            with open(output_path, "rb") as output_file:
+                image = output_file.read()
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(image[:5], b"\x7fELF\x01")
+        section_header_offset, = struct.unpack_from("<I", image, 32)
+        section_header_size, section_count = struct.unpack_from("<HH", image, 46)
+        sections = [struct.unpack_from("<IIIIIIIIII", image, section_header_offset + i * section_header_size)
+                    for i in range(section_count)]
+        rela_sections = [section for section in sections if section[1] == 4]
+        self.assertEqual(len(rela_sections), 1)
+        _, _, _, _, rela_offset, rela_size, _, _, _, rela_entry_size = rela_sections[0]
+        self.assertEqual(rela_entry_size, 12)
+        self.assertEqual(rela_size, 12 * len(writer.text_rela_section.relocations))
+        self.assertLessEqual(rela_offset + rela_size, len(image))
+        offset, info, addend = struct.unpack_from("<IIi", image, rela_offset)
+        self.assertEqual(info & 0xFF, 2)
+        self.assertEqual(addend, -4)
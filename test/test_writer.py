@@ -0,0 +1,212 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from peachpy import *
+from peachpy.x86_64 import *
+from peachpy.writer import AssemblyWriter
+
+
+class AssemblyWriterOutput(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_listing(self, assembly_format, functions):
+        output_path = os.path.join(self.temp_dir, "output.s")
+        writer = AssemblyWriter(output_path, assembly_format, "input.py")
+        with writer:
+            writer.add_functions(functions)
+        with open(output_path) as output_file:
+            return writer, output_file.read()
+
+    def runTest(self):
+        formats = [("gas", abi.system_v_x86_64_abi), ("nasm", abi.system_v_x86_64_abi), ("go", abi.goasm_amd64_abi)]
+        for assembly_format, function_abi in formats:
+            writer, listing = self.write_listing(assembly_format, [])
+            self.assertEqual(listing, writer.prologue + os.linesep * 3)
+
+            functions = []
+            for name in ["f", "g"]:
+                x = Argument(uint32_t)
+                with Function(name, (x,), uint32_t) as function:
+                    r_x = GeneralPurposeRegister32()
+                    LOAD.ARGUMENT(r_x, x)
+                    ADD(r_x, 1)
+                    RETURN(r_x)
+                functions.append(function.finalize(function_abi))
+
+            writer, listing = self.write_listing(assembly_format, functions[:1])
+            function_lines = functions[0].format(assembly_format, line_separator=None,
+                                                 line_number=writer.prologue_lines)
+            self.assertEqual(listing, writer.prologue + os.linesep * 3 + os.linesep.join(function_lines))
+
+            writer, listing = self.write_listing(assembly_format, functions)
+            function_lines = functions[0].format(assembly_format, line_separator=None,
+                                                 line_number=writer.prologue_lines)
+            function_lines += functions[1].format(assembly_format, line_separator=None,
+                                                  line_number=writer.prologue_lines + len(function_lines))
+            self.assertEqual(listing, writer.prologue + os.linesep * 3 + os.linesep.join(function_lines))
+
+
+class ActiveWriters(unittest.TestCase):
+    def setUp(self):
+        import peachpy.x86_64.options
+        self.temp_dir = tempfile.mkdtemp()
+        self.abi = peachpy.x86_64.options.abi
+        peachpy.x86_64.options.abi = abi.system_v_x86_64_abi
+
+    def tearDown(self):
+        import peachpy.x86_64.options
+        peachpy.x86_64.options.abi = self.abi
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def define_function():
+        with Function("f", tuple()):
+            RETURN()
+
+    def runTest(self):
+        import threading
+        from peachpy.writer import NullWriter, get_active_writers
+
+        writer = AssemblyWriter(os.path.join(self.temp_dir, "output.s"), "gas")
+        with writer:
+            thread_writers = []
+
+            def thread_main():
+                thread_writers.append(list(get_active_writers()))
+                self.define_function()
+                thread_writers.append(list(get_active_writers()))
+
+            thread = threading.Thread(target=thread_main)
+            thread.start()
+            thread.join()
+            self.assertEqual(thread_writers, [[], []])
+            self.assertEqual(writer.content_lines, 0)
+
+            with NullWriter():
+                self.assertEqual(get_active_writers(), [])
+                self.define_function()
+            self.assertEqual(writer.content_lines, 0)
+            self.assertEqual(get_active_writers(), [writer])
+
+            self.define_function()
+            self.assertNotEqual(writer.content_lines, 0)
+        self.assertEqual(get_active_writers(), [])
+
+
+class WriterOutputFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def runTest(self):
+        import stat
+        from peachpy.writer import ImageWriter
+
+        class FailingWriter(ImageWriter):
+            def write_to(self, output_file):
+                output_file.write(b"partial")
+                raise RuntimeError()
+
+        output_path = os.path.join(self.temp_dir, "output.o")
+        unrelated_path = output_path + ".tmp"
+        for path in [output_path, unrelated_path]:
+            with open(path, "wb") as output_file:
+                output_file.write(b"previous content")
+
+        with self.assertRaises(RuntimeError):
+            with FailingWriter(output_path):
+                pass
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["output.o", "output.o.tmp"])
+        for path in [output_path, unrelated_path]:
+            with open(path, "rb") as output_file:
+                self.assertEqual(output_file.read(), b"previous content")
+
+        with ImageWriter(output_path):
+            pass
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ["output.o", "output.o.tmp"])
+        self.assertEqual(os.path.getsize(output_path), 0)
+        with open(unrelated_path, "rb") as output_file:
+            self.assertEqual(output_file.read(), b"previous content")
+
+        if os.name == "posix":
+            new_path = os.path.join(self.temp_dir, "new.o")
+            with ImageWriter(new_path):
+                pass
+            umask = os.umask(0)
+            os.umask(umask)
+            self.assertEqual(stat.S_IMODE(os.stat(new_path).st_mode), 0o666 & ~umask)
+
+            link_path = os.path.join(self.temp_dir, "link.o")
+            os.symlink(output_path, link_path)
+            with AssemblyWriter(link_path, "gas"):
+                pass
+            self.assertTrue(os.path.islink(link_path))
+            with open(output_path) as output_file:
+                self.assertTrue(output_file.read().startswith("# Generated by PeachPy"))
+
+            with AssemblyWriter(os.devnull, "gas"):
+                pass
+            self.assertTrue(stat.S_ISCHR(os.stat(os.devnull).st_mode))
+
+        if os.path.isdir("/dev/fd"):
+            # Links to pipes, e.g. /dev/stdout redirected to another process, are written directly
+            read_fd, write_fd = os.pipe()
+            try:
+                with AssemblyWriter("/dev/fd/%d" % write_fd, "gas"):
+                    pass
+                os.close(write_fd)
+                write_fd = None
+                with os.fdopen(read_fd) as pipe:
+                    read_fd = None
+                    self.assertTrue(pipe.read().startswith("# Generated by PeachPy"))
+            finally:
+                for fd in [read_fd, write_fd]:
+                    if fd is not None:
+                        os.close(fd)
+
+
+class DurableWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def runTest(self):
+        from peachpy.writer import ELFWriter
+
+        synced_files = []
+        fsync = os.fsync
+
+        def record_fsync(fd):
+            synced_files.append(os.fstat(fd).st_ino)
+            fsync(fd)
+
+        output_path = os.path.join(self.temp_dir, "output.o")
+        os.fsync = record_fsync
+        try:
+            with ELFWriter(output_path, abi.system_v_x86_64_abi):
+                pass
+            self.assertEqual(synced_files, [])
+
+            with ELFWriter(output_path, abi.system_v_x86_64_abi, durable=True):
+                pass
+
+            # Devices are written directly and can not be synced
+            with AssemblyWriter(os.devnull, "gas", durable=True):
+                pass
+        finally:
+            os.fsync = fsync
+
+        expected_files = [os.stat(output_path).st_ino]
+        if os.name == "posix":
+            expected_files.append(os.stat(self.temp_dir).st_ino)
+        self.assertEqual(synced_files, expected_files)
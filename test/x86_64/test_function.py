@@ -165,6 +165,49 @@ uint32_t integer_sum(uint32_t x, uint32_t y)
 """
         assert equal_codes(code, ref_code), "Unexpected PeachPy code:\n" + code
 
+
+class EncodeOnce(unittest.TestCase):
+    def runTest(self):
+        with Function("empty", tuple()) as function:
+            RETURN()
+
+        abi_function = function.finalize(abi.system_v_x86_64_abi)
+        assert abi_function.encode() is abi_function.encode(), "ABIFunction.encode must reuse the encoded function"
+
+
+class EncodeOnceMultipleWriters(unittest.TestCase):
+    def runTest(self):
+        import os
+        import shutil
+        import tempfile
+        import peachpy.x86_64.options
+        from peachpy.writer import ELFWriter
+
+        temp_dir = tempfile.mkdtemp()
+        default_abi = peachpy.x86_64.options.abi
+        peachpy.x86_64.options.abi = abi.system_v_x86_64_abi
+        try:
+            writers = [ELFWriter(os.path.join(temp_dir, name), abi.system_v_x86_64_abi) for name in ["a.o", "b.o"]]
+            with writers[0], writers[1]:
+                for name in ["f", "g"]:
+                    with Function(name, tuple(), uint32_t):
+                        MOV(eax, Constant.uint32(42))
+                        ADD(eax, Constant.uint32(1))
+                        RETURN(eax)
+            images = []
+            for writer in writers:
+                with open(writer.output_path, "rb") as image_file:
+                    images.append(image_file.read())
+        finally:
+            peachpy.x86_64.options.abi = default_abi
+            shutil.rmtree(temp_dir)
+
+        assert writers[0].text_section.content == writers[1].text_section.content
+        assert writers[0].rodata_section.content == writers[1].rodata_section.content
+        assert len(writers[0].text_rela_section.relocations) == 4
+        assert images[0] == images[1], "Writers which share encoded functions must produce identical images"
+
+
 class SimpleLoop(unittest.TestCase):
     def runTest(self):
         x = Argument(ptr(const_float_))